@@ -2,23 +2,39 @@
 """FFT and non-uniform FFT (NUFFT) functions.
 
 """
+import collections
+import functools
+
+import jax
 import jax.numpy as jnp
 import numpy as np
 from transforms import util, interp
 
 from math import ceil
 
-__all__ = ['fft', 'ifft', 'nufft']
+# Grid cells per gridding tile, 1 MiB of complex64.
+_TILE_CELLS = 2 ** 17
+
+__all__ = ['fft', 'ifft', 'nufft', 'nufft_vmap', 'nufft_adjoint_vmap',
+           'make_nufft_plan']
 
 
-def fft(input, oshape=None, axes=None, center=True, norm=None):
+def fft(input, oshape=None, axes=None, center=True, norm=None,
+        method='shift'):
   """FFT function that supports centering.
 
+  Real inputs are transformed with rfftn, and the rest of the spectrum
+  is filled in from Hermitian symmetry.
+
   Args:
       input (array): input array.
       oshape (None or array of ints): output shape.
       axes (None or array of ints): Axes over which to compute the FFT.
       norm (None or ``"ortho"``): Keyword to specify the normalization mode.
+      method (``"shift"`` or ``"checker"``): How centering is performed.
+          ``"shift"`` uses ifftshift/fftshift around the transform,
+          ``"checker"`` multiplies the input and output by separable
+          phases instead, which is a checkerboard of signs for even sizes.
 
   Returns:
       array: FFT result of dimension oshape.
@@ -28,12 +44,21 @@ def fft(input, oshape=None, axes=None, center=True, norm=None):
 
   """
   if not np.issubdtype(input.dtype, jnp.complexfloating):
-    input = input.astype(jnp.complex64)
+    input = input.astype(jnp.float32)
+
+  # Shapes and axes are static arguments of the jitted kernels.
+  if oshape is not None:
+    oshape = tuple(oshape)
+  if axes is not None:
+    axes = tuple(axes)
+
+  if method not in ('shift', 'checker'):
+    raise ValueError('Unknown centering method: {}'.format(method))
 
   if center:
-    output = _fftc(input, oshape=oshape, axes=axes, norm=norm)
+    output = _fftc(input, oshape=oshape, axes=axes, norm=norm, method=method)
   else:
-    output = jnp.fft.fftn(input, s=oshape, axes=axes, norm=norm)
+    output = _fftn(input, s=oshape, axes=axes, norm=norm)
 
   if np.issubdtype(input.dtype,
                    jnp.complexfloating) and input.dtype != output.dtype:
@@ -42,7 +67,8 @@ def fft(input, oshape=None, axes=None, center=True, norm=None):
   return output
 
 
-def ifft(input, oshape=None, axes=None, center=True, norm=None):
+def ifft(input, oshape=None, axes=None, center=True, norm=None,
+         method='shift'):
   """IFFT function that supports centering.
 
   Args:
@@ -51,6 +77,10 @@ def ifft(input, oshape=None, axes=None, center=True, norm=None):
       axes (None or array of ints): Axes over which to compute
           the inverse FFT.
       norm (None or ``"ortho"``): Keyword to specify the normalization mode.
+      method (``"shift"`` or ``"checker"``): How centering is performed.
+          ``"shift"`` uses ifftshift/fftshift around the transform,
+          ``"checker"`` multiplies the input and output by separable
+          phases instead, which is a checkerboard of signs for even sizes.
 
   Returns:
       array of dimension oshape.
@@ -62,8 +92,17 @@ def ifft(input, oshape=None, axes=None, center=True, norm=None):
   if not np.issubdtype(input.dtype, jnp.complexfloating):
     input = input.astype(jnp.complex64)
 
+  # Shapes and axes are static arguments of the jitted kernels.
+  if oshape is not None:
+    oshape = tuple(oshape)
+  if axes is not None:
+    axes = tuple(axes)
+
+  if method not in ('shift', 'checker'):
+    raise ValueError('Unknown centering method: {}'.format(method))
+
   if center:
-    output = _ifftc(input, oshape=oshape, axes=axes, norm=norm)
+    output = _ifftc(input, oshape=oshape, axes=axes, norm=norm, method=method)
   else:
     output = jnp.fft.ifftn(input, s=oshape, axes=axes, norm=norm)
 
@@ -74,7 +113,7 @@ def ifft(input, oshape=None, axes=None, center=True, norm=None):
   return output
 
 
-def nufft(input, coord, oversamp=1.25, width=4):
+def nufft(input, coord, oversamp=1.25, width=4, dtype_kernel=None):
   """Non-uniform Fast Fourier Transform.
 
   Args:
@@ -87,10 +126,16 @@ def nufft(input, coord, oversamp=1.25, width=4):
           ndim determines the number of dimensions to apply the nufft.
           coord[..., i] should be scaled to have its range between
           -n_i // 2, and n_i // 2.
-      oversamp (float): oversampling factor.
+      oversamp (float): oversampling factor. The oversampled grid is
+          rounded up to FFT-friendly sizes, so the effective factor
+          may be slightly larger.
       width (float): interpolation kernel full-width in terms of
           oversampled grid.
       n (int): number of sampling points of the interpolation kernel.
+      dtype_kernel (None or dtype): storage type of the interpolation
+          kernel table, e.g. ``jnp.bfloat16`` to halve its memory
+          traffic. Weights are accumulated in float32. Defaults to
+          float32.
 
   Returns:
       array: Fourier domain data of shape
@@ -105,29 +150,46 @@ def nufft(input, coord, oversamp=1.25, width=4):
       IEEE transactions on medical imaging, 24(6), 799-808.
 
   """
+  return _nufft(input, coord, oversamp=oversamp, width=width,
+                dtype_kernel=dtype_kernel)
+
+
+@functools.partial(jax.jit,
+                   static_argnames=('oversamp', 'width', 'dtype_kernel'))
+def _nufft(input, coord, oversamp, width, dtype_kernel=None):
   ndim = coord.shape[-1]
-  beta = np.pi * (((width / oversamp) * (oversamp - 0.5)) ** 2 - 0.8) ** 0.5
-  os_shape = _get_oversamp_shape(input.shape, ndim, oversamp)
+  scale, shift = _make_scale_shift(tuple(input.shape[-ndim:]), oversamp,
+                                   coord.dtype)
+  coord = _scale_coord(coord, scale, shift)
+  return _nufft_scaled(input, coord, oversamp, width, dtype_kernel)
+
 
-  # Apodize
-  output = _apodize(input, ndim, oversamp, width, beta)
+def _nufft_scaled(input, coord, oversamp, width, dtype_kernel=None):
+  # coord is already scaled to the oversampled grid.
+  ndim = coord.shape[-1]
+  beta = _get_beta(oversamp, width)
+  os_shape = _get_oversamp_shape(input.shape, ndim, oversamp)
 
-  # Zero-pad
-  output /= util.prod(input.shape[-ndim:]) ** 0.5
-  output = util.resize(output, os_shape)
+  # Apodize, with the ifftshift of the FFT folded in as a phase and the
+  # normalization and kernel scaling folded in as a constant
+  factor = 1 / (util.prod(input.shape[-ndim:]) ** 0.5 * width ** ndim)
+  output = _apodize(input, ndim, oversamp, width, beta, sign=1,
+                    factor=float(factor))
 
-  # FFT
-  output = fft(output, axes=range(-ndim, 0), norm=None)
+  # Zero-pad within the FFT, with the fftshift applied as a phase
+  output = _fft_trailing(output, ndim, oshape=os_shape)
+  output = _checkerboard(output, range(-ndim, 0), 1,
+                         sizes=input.shape[-ndim:])
 
   # Interpolate
-  coord = _scale_coord(coord, input.shape, oversamp)
-  output = interp.interpolate(output, coord, kernel='kaiser_bessel', width=width, param=beta)
-  output /= width ** ndim
+  output = interp.interpolate(output, coord, kernel='table', width=width,
+                              param=_kb_table(beta, dtype=dtype_kernel))
 
   return output
 
 
-def nufft_adjoint(input, coord, oshape, oversamp=1.25, width=4):
+def nufft_adjoint(input, coord, oshape, oversamp=1.25, width=4,
+                  dtype_kernel=None):
   """Adjoint non-uniform Fast Fourier Transform.
 
   Args:
@@ -142,10 +204,16 @@ def nufft_adjoint(input, coord, oshape, oversamp=1.25, width=4):
           -n_i // 2, and n_i // 2.
       oshape (tuple of ints): output shape of the form
           (..., n_{ndim - 1}, ..., n_1, n_0).
-      oversamp (float): oversampling factor.
+      oversamp (float): oversampling factor. The oversampled grid is
+          rounded up to FFT-friendly sizes, so the effective factor
+          may be slightly larger.
       width (float): interpolation kernel full-width in terms of
           oversampled grid.
       n (int): number of sampling points of the interpolation kernel.
+      dtype_kernel (None or dtype): storage type of the interpolation
+          kernel table, e.g. ``jnp.bfloat16`` to halve its memory
+          traffic. Weights are accumulated in float32. Defaults to
+          float32.
 
   Returns:
       array: signal domain array with shape specified by oshape.
@@ -154,88 +222,479 @@ def nufft_adjoint(input, coord, oshape, oversamp=1.25, width=4):
       :func:`sigpy.nufft.nufft`
 
   """
+  return _nufft_adjoint(input, coord, tuple(oshape),
+                        oversamp=oversamp, width=width,
+                        dtype_kernel=dtype_kernel)
+
+
+@functools.partial(jax.jit, static_argnames=('oshape', 'oversamp', 'width',
+                                             'dtype_kernel'))
+def _nufft_adjoint(input, coord, oshape, oversamp, width, dtype_kernel=None):
   ndim = coord.shape[-1]
-  beta = np.pi * (((width / oversamp) * (oversamp - 0.5)) ** 2 - 0.8) ** 0.5
+  scale, shift = _make_scale_shift(oshape[-ndim:], oversamp, coord.dtype)
+  coord = _scale_coord(coord, scale, shift)
+  return _nufft_adjoint_scaled(input, coord, oshape, oversamp, width,
+                               dtype_kernel=dtype_kernel)
+
+
+def _nufft_adjoint_scaled(input, coord, oshape, oversamp, width,
+                          presorted=False, dtype_kernel=None):
+  # coord is already scaled to the oversampled grid.
+  ndim = coord.shape[-1]
+  beta = _get_beta(oversamp, width)
   oshape = list(oshape)
 
   os_shape = _get_oversamp_shape(oshape, ndim, oversamp)
 
+  # Sort the points by grid tile, so that consecutive points spread
+  # into the same cached region of the grid. Grids that fit in a single
+  # tile are left as is.
+  npts = util.prod(coord.shape[:-1])
+  input = input.reshape(list(input.shape[:input.ndim - coord.ndim + 1])
+                        + [npts])
+  coord = coord.reshape([npts, ndim])
+  if not presorted and util.prod(os_shape[-ndim:]) > _TILE_CELLS:
+    order = _tile_order(coord, os_shape[-ndim:])
+    input = input[..., order]
+    coord = coord[order]
+
   # Gridding
-  coord = _scale_coord(coord, oshape, oversamp)
   output = interp.gridding(input, coord, os_shape,
-                           kernel='kaiser_bessel', width=width, param=beta)
+                           kernel='table', width=width,
+                           param=_kb_table(beta, dtype=dtype_kernel))
   # import sigpy
   # output = sigpy.interp.gridding(np.array(input), np.array(coord), os_shape,
   #                                kernel='kaiser_bessel', width=width, param=beta)
-  output /= width ** ndim
 
-  # IFFT
-  output = ifft(output, axes=range(-ndim, 0), norm=None)
+  # IFFT, with the ifftshift applied as a phase
+  output = _checkerboard(output, range(-ndim, 0), -1)
+  output = _fft_trailing(output, ndim, inverse=True)
 
   # Crop
   output = util.resize(output, oshape)
-  output *= util.prod(os_shape[-ndim:]) / util.prod(oshape[-ndim:]) ** 0.5
 
-  # Apodize
-  output = _apodize(output, ndim, oversamp, width, beta)
+  # Apodize, with the fftshift of the IFFT folded in as a phase and the
+  # normalization and kernel scaling folded in as a constant
+  factor = (util.prod(os_shape[-ndim:]) / util.prod(oshape[-ndim:]) ** 0.5
+            / width ** ndim)
+  output = _apodize(output, ndim, oversamp, width, beta, sign=-1,
+                    factor=float(factor))
 
   return output
 
 
-def _fftc(input, oshape=None, axes=None, norm=None):
+NufftPlan = collections.namedtuple('NufftPlan', ['forward', 'adjoint'])
+
+
+def make_nufft_plan(shape, coord, oversamp=1.25, width=4):
+  """Precomputes a NUFFT for a fixed shape and trajectory.
+
+  The kernel parameter and the scaled coordinates are computed once,
+  and the returned functions are jitted closures over them, so they
+  become constants of the compiled kernels.
+
+  Args:
+      shape (tuple of ints): signal domain shape of the form
+          (..., n_{ndim - 1}, ..., n_1, n_0).
+      coord (array): Fourier domain coordinate array of shape (..., ndim),
+          scaled as in :func:`nufft`.
+      oversamp (float): oversampling factor.
+      width (float): interpolation kernel full-width in terms of
+          oversampled grid.
+
+  Returns:
+      NufftPlan: named tuple of functions, ``forward(input)`` computing
+          the nufft of a signal domain array of the given shape and
+          ``adjoint(input)`` computing the nufft_adjoint back to it.
+
+  See Also:
+      :func:`nufft`, :func:`nufft_adjoint`
+
+  """
+  shape = tuple(shape)
+  ndim = coord.shape[-1]
+  pts_shape = tuple(coord.shape[:-1])
+  coord = jnp.asarray(coord)
+  scale, shift = _make_scale_shift(shape[-ndim:], oversamp, coord.dtype)
+  coord = _scale_coord(coord, scale, shift)
+
+  # The points are sorted by grid tile once for both directions, unless
+  # the grid fits in a single tile.
+  coord = coord.reshape([-1, ndim])
+  os_shape = _get_oversamp_shape(shape, ndim, oversamp)
+  tiled = util.prod(os_shape[-ndim:]) > _TILE_CELLS
+  if tiled:
+    order = _tile_order(coord, os_shape[-ndim:])
+    inverse_order = jnp.argsort(order)
+    coord = coord[order]
+
+  def forward(input):
+    output = _nufft_scaled(input, coord, oversamp, width)
+    if tiled:
+      output = output[..., inverse_order]
+    return output.reshape(output.shape[:-1] + pts_shape)
+
+  def adjoint(input):
+    input = input.reshape(input.shape[:input.ndim - len(pts_shape)] + (-1,))
+    if tiled:
+      input = input[..., order]
+    return _nufft_adjoint_scaled(input, coord, shape, oversamp, width,
+                                 presorted=True)
+
+  return NufftPlan(jax.jit(forward), jax.jit(adjoint))
+
+
+def nufft_vmap(input, coord, oversamp=1.25, width=4, coord_axis=None):
+  """Non-uniform Fast Fourier Transform vectorized over a batch.
+
+  The batch is mapped with :func:`jax.vmap`, so it is compiled as a
+  single kernel instead of a Python loop of :func:`nufft` calls.
+
+  Args:
+      input (array): batch of input signal domain arrays, batched along
+          the first axis.
+      coord (array): Fourier domain coordinate array. It is shared by
+          the whole batch by default.
+      oversamp (float): oversampling factor.
+      width (float): interpolation kernel full-width in terms of
+          oversampled grid.
+      coord_axis (None or int): axis of coord to map over for per-sample
+          coordinates, None for shared coordinates.
+
+  Returns:
+      array: batch of Fourier domain data, batched along the first axis.
+
+  See Also:
+      :func:`nufft`
+
+  """
+  return _nufft_vmap_impl(oversamp, width, coord_axis)(input, coord)
+
+
+def nufft_adjoint_vmap(input, coord, oshape, oversamp=1.25, width=4,
+                       coord_axis=None):
+  """Adjoint non-uniform Fast Fourier Transform vectorized over a batch.
+
+  Args:
+      input (array): batch of input Fourier domain arrays, batched along
+          the first axis.
+      coord (array): Fourier domain coordinate array. It is shared by
+          the whole batch by default.
+      oshape (tuple of ints): output shape of a single batch element.
+      oversamp (float): oversampling factor.
+      width (float): interpolation kernel full-width in terms of
+          oversampled grid.
+      coord_axis (None or int): axis of coord to map over for per-sample
+          coordinates, None for shared coordinates.
+
+  Returns:
+      array: batch of signal domain arrays, batched along the first axis.
+
+  See Also:
+      :func:`nufft_adjoint`
+
+  """
+  return _nufft_adjoint_vmap_impl(tuple(oshape), oversamp, width,
+                                  coord_axis)(input, coord)
+
+
+# The batched kernels are built once per configuration and jitted, since
+# a fresh jax.vmap retraces the whole NUFFT on every call.
+@functools.lru_cache(maxsize=64)
+def _nufft_vmap_impl(oversamp, width, coord_axis):
+  return jax.jit(jax.vmap(
+      functools.partial(nufft, oversamp=oversamp, width=width),
+      in_axes=(0, coord_axis)))
+
+
+@functools.lru_cache(maxsize=64)
+def _nufft_adjoint_vmap_impl(oshape, oversamp, width, coord_axis):
+  return jax.jit(jax.vmap(
+      functools.partial(nufft_adjoint, oshape=oshape, oversamp=oversamp,
+                        width=width),
+      in_axes=(0, coord_axis)))
+
+
+@functools.partial(jax.jit,
+                   static_argnames=('oshape', 'axes', 'norm', 'method'))
+def _fftc(input, oshape=None, axes=None, norm=None, method='shift'):
+  # Axes are sorted ascending, so the shifts and the FFT treat the
+  # contiguous last axis innermost whatever order the caller gave.
   ndim = input.ndim
   axes = util._normalize_axes(axes, ndim)
 
   if oshape is None:
     oshape = input.shape
 
+  if method == 'checker' and _pads_only(input.shape, oshape, axes):
+    # The FFT zero-pads at the end, the centering is left to the phases.
+    tmp = _checkerboard(input, axes, 1, center=True,
+                        sizes=_axes_shape(oshape, axes))
+    tmp = _fftn(tmp, s=_axes_shape(oshape, axes), axes=axes, norm=norm)
+    return _checkerboard(tmp, axes, 1, sizes=[input.shape[a] for a in axes])
+
   tmp = util.resize(input, oshape)
-  tmp = jnp.fft.ifftshift(tmp, axes=axes)
-  tmp = jnp.fft.fftn(tmp, axes=axes, norm=norm)
-  output = jnp.fft.fftshift(tmp, axes=axes)
+  if method == 'checker':
+    tmp = _checkerboard(tmp, axes, 1, center=True)
+    tmp = _fftn(tmp, axes=axes, norm=norm)
+    return _checkerboard(tmp, axes, 1)
+
+  tmp = _ifftshift_multi(tmp, axes)
+  tmp = _fftn(tmp, axes=axes, norm=norm)
+  output = _fftshift_multi(tmp, axes)
   return output
 
 
-def _ifftc(input, oshape=None, axes=None, norm=None):
+@functools.partial(jax.jit,
+                   static_argnames=('oshape', 'axes', 'norm', 'method'))
+def _ifftc(input, oshape=None, axes=None, norm=None, method='shift'):
+  # Axes are sorted ascending, so the shifts and the FFT treat the
+  # contiguous last axis innermost whatever order the caller gave.
   ndim = input.ndim
   axes = util._normalize_axes(axes, ndim)
 
   if oshape is None:
     oshape = input.shape
 
+  if method == 'checker' and _pads_only(input.shape, oshape, axes):
+    # The FFT zero-pads at the end, the centering is left to the phases.
+    tmp = _checkerboard(input, axes, -1, center=True,
+                        sizes=_axes_shape(oshape, axes))
+    tmp = jnp.fft.ifftn(tmp, s=_axes_shape(oshape, axes), axes=axes,
+                        norm=norm)
+    return _checkerboard(tmp, axes, -1, sizes=[input.shape[a] for a in axes])
+
   tmp = util.resize(input, oshape)
-  tmp = jnp.fft.ifftshift(tmp, axes=axes)
+  if method == 'checker':
+    tmp = _checkerboard(tmp, axes, -1, center=True)
+    tmp = jnp.fft.ifftn(tmp, axes=axes, norm=norm)
+    return _checkerboard(tmp, axes, -1)
+
+  tmp = _ifftshift_multi(tmp, axes)
   tmp = jnp.fft.ifftn(tmp, axes=axes, norm=norm)
-  output = jnp.fft.fftshift(tmp, axes=axes)
+  output = _fftshift_multi(tmp, axes)
   return output
 
 
-def _scale_coord(coord, shape, oversamp):
-  ndim = coord.shape[-1]
-  scale = np.ceil(oversamp * np.array(shape[-ndim:])) / shape[-ndim:]
-  shift = np.ceil(oversamp * np.array(shape[-ndim:])) // 2
+def _scale_coord(coord, scale, shift):
   return coord * scale + shift
 
 
+@functools.lru_cache(maxsize=64)
+def _make_scale_shift(shape, oversamp, dtype):
+  dtype = np.promote_types(dtype, np.float32)
+  os_shape = np.array(_get_oversamp_sizes(shape, oversamp))
+  scale = (os_shape / shape).astype(dtype)
+  shift = (os_shape // 2).astype(dtype)
+
+  scale.flags.writeable = False
+  shift.flags.writeable = False
+  return scale, shift
+
+
+def _tile_order(coord, os_shape):
+  # Permutation sorting flattened points by the tile of the oversampled
+  # grid they fall in, tiles holding about _TILE_CELLS cells.
+  ndim = coord.shape[-1]
+  tile = max(int(_TILE_CELLS ** (1 / ndim)), 1)
+  bins = jnp.floor(coord / tile).astype(jnp.int32)
+  key = bins[:, 0]
+  for a in range(1, ndim):
+    key = key * (os_shape[a] // tile + 2) + bins[:, a]
+
+  return jnp.argsort(key)
+
+
+def _get_beta(oversamp, width):
+  return np.pi * (((width / oversamp) * (oversamp - 0.5)) ** 2 - 0.8) ** 0.5
+
+
+@functools.lru_cache(maxsize=64)
+def _kb_table(beta, n=1024, dtype=None):
+  # Kaiser-Bessel kernel sampled on |x| in [0, 1] for the 'table' kernel.
+  x = np.linspace(0, 1, n)
+  table = np.i0(beta * (1 - x ** 2) ** 0.5).astype(dtype or np.float32)
+
+  table.flags.writeable = False
+  return table
+
+
 def _get_oversamp_shape(shape, ndim, oversamp):
-  return list(shape)[:-ndim] + [ceil(oversamp * i) for i in shape[-ndim:]]
+  return list(shape)[:-ndim] + list(
+      _get_oversamp_sizes(tuple(shape[-ndim:]), oversamp))
+
+
+@functools.lru_cache(maxsize=64)
+def _get_oversamp_sizes(shape, oversamp):
+  # Oversampled sizes are rounded up to 5-smooth numbers, which the FFT
+  # handles fastest, so the effective oversamp may be slightly larger
+  # than requested.
+  return tuple(_next_fast_len(ceil(oversamp * i)) for i in shape)
+
+
+def _next_fast_len(n):
+  # Smallest product of 2, 3 and 5 that is >= n.
+  best = 2 ** (n - 1).bit_length()
+  p5 = 1
+  while p5 < best:
+    p35 = p5
+    while p35 < best:
+      p235 = p35
+      while p235 < n:
+        p235 *= 2
+      best = min(best, p235)
+      p35 *= 3
+    p5 *= 5
+
+  return best
+
+
+@functools.partial(jax.jit, static_argnames=('s', 'axes', 'norm'))
+def _fftn(input, s=None, axes=None, norm=None):
+  # s pairs with axes as in numpy.fft.fftn. Both are reordered together
+  # so the axes are ascending.
+  if s is not None:
+    if axes is None:
+      axes = range(-len(s), 0)
+    pairs = sorted((a % input.ndim, n) for a, n in zip(axes, s))
+    axes = tuple(a for a, _ in pairs)
+    s = tuple(n for _, n in pairs)
+  axes = util._normalize_axes(axes, input.ndim)
+  if np.issubdtype(input.dtype, jnp.complexfloating):
+    return jnp.fft.fftn(input, s=s, axes=axes, norm=norm)
+
+  # Real input: only the first n // 2 + 1 frequencies of the last axis are
+  # computed, the others are conj(X[-k]) with -k taken modulo each axis.
+  n = input.shape[axes[-1]] if s is None else s[-1]
+  half = jnp.fft.rfftn(input, s=s, axes=axes, norm=norm)
+  tail = jax.lax.slice_in_dim(half, 1, n - n // 2, axis=axes[-1])
+  tail = jnp.flip(tail, axes)
+  if len(axes) > 1:
+    tail = jnp.roll(tail, [1] * (len(axes) - 1), axes[:-1])
+
+  return jnp.concatenate([half, jnp.conj(tail)], axis=axes[-1])
+
+
+def _fft_trailing(input, ndim, oshape=None, inverse=False):
+  # Unnormalized (I)FFT over the last ndim axes, zero-padded at the end to
+  # oshape. The NUFFT applies centering and scaling as separate multiplies,
+  # so complex inputs go straight to lax.fft, which handles up to three
+  # axes. Real inputs keep the rfftn path of fft.
+  axes = tuple(range(-ndim, 0))
+  s = None if oshape is None else tuple(oshape[-ndim:])
+  if ndim > 3 or not np.issubdtype(input.dtype, np.complexfloating):
+    if inverse:
+      return jnp.fft.ifftn(input, s=s, axes=axes)
+    return _fftn(input, s=s, axes=axes)
+
+  if oshape is not None:
+    input = jnp.pad(input, [(0, 0)] * (input.ndim - ndim) + [
+        (0, o - i) for i, o in zip(input.shape[-ndim:], oshape[-ndim:])])
+
+  fft_type = 'ifft' if inverse else 'fft'
+  return jax.lax.fft(input, fft_type, input.shape[-ndim:])
+
+
+def _axes_shape(oshape, axes):
+  if oshape is None:
+    return None
+
+  return tuple(oshape[a] for a in axes)
+
+
+def _pads_only(ishape, oshape, axes):
+  # Whether resizing ishape to oshape only zero-pads along axes.
+  return len(ishape) == len(oshape) and all(
+      o >= i if a in axes else o == i
+      for a, (i, o) in enumerate(zip(ishape, oshape)))
+
+
+def _fftshift_multi(input, axes):
+  # Rolls all axes in one call rather than one axis at a time.
+  return jnp.roll(input, [input.shape[a] // 2 for a in axes], axes)
+
 
+def _ifftshift_multi(input, axes):
+  return jnp.roll(input, [-(input.shape[a] // 2) for a in axes], axes)
 
-def _apodize(input, ndim, oversamp, width, beta):
+
+def _checkerboard(input, axes, sign, center=False, sizes=None):
+  """Multiplies input by the phase that replaces an fftshift.
+
+  Along an axis, a length N centered DFT of a length n <= N input
+  zero-padded at the end factors as a plain DFT between the phases
+  ``exp(sign * 2j * pi * (N // 2) * (idx - n // 2) / N)`` on its input
+  (center=True) and ``exp(sign * 2j * pi * (n // 2) * idx / N)`` on its
+  output, sign being 1 for the forward and -1 for the inverse transform.
+  sizes gives N for the former and n for the latter along axes, and
+  defaults to the axis lengths. When n = N is even both phases
+  are the checkerboard ``(-1) ** idx`` up to a global sign.
+
+  """
   output = input
-  for a in range(-ndim, 0):
+  axes = [a % output.ndim for a in axes]
+  if sizes is None:
+    sizes = [output.shape[a] for a in axes]
+
+  for a, n in zip(axes, sizes):
     i = output.shape[a]
-    os_i = ceil(oversamp * i)
-    idx = np.arange(i, dtype=output.dtype)
+    if center:
+      phase = _checkerboard_phase(np.arange(i) - i // 2, n // 2, n, sign,
+                                  output.dtype)
+    else:
+      phase = _checkerboard_phase(np.arange(i), n // 2, i, sign,
+                                  output.dtype)
 
-    # Calculate apodization
-    apod = (beta ** 2 - (np.pi * width * (idx - i // 2) / os_i) ** 2) ** 0.5
-    apod /= np.sinh(apod)
-    output *= apod.reshape([i] + [1] * (-a - 1))
+    output = output * phase.reshape([i] + [1] * (output.ndim - a - 1))
 
   return output
 
 
+def _checkerboard_phase(idx, shift, n, sign, dtype):
+  if 2 * shift == n:
+    phase = 1 - 2 * (idx % 2)
+  else:
+    phase = np.exp(sign * 2j * np.pi * shift * idx / n)
+    dtype = np.promote_types(dtype, np.complex64)
+
+  return phase.astype(dtype)
+
+
+def _apodize(input, ndim, oversamp, width, beta, sign=None, factor=1):
+  apods = []
+  os_shape = _get_oversamp_sizes(input.shape[-ndim:], oversamp)
+  for a in range(-ndim, 0):
+    i = input.shape[a]
+    os_i = os_shape[a]
+    # The constant factor rides on the first axis only.
+    apods.append(_apod_1d(i, os_i, width, beta, sign,
+                          factor if a == -ndim else 1, input.dtype))
+
+  # Separable outer product applied in a single multiply, which XLA fuses
+  # into one kernel without materializing the full tensor.
+  apod = functools.reduce(lambda x, y: x[..., None] * y,
+                          [jnp.asarray(v) for v in apods])
+  return input * apod
+
+
+@functools.lru_cache(maxsize=64)
+def _apod_1d(i, os_i, width, beta, sign, factor, dtype):
+  # Kept as a host array: it becomes a constant of the jitted kernels,
+  # whereas a cached jax array built while tracing would leak a tracer.
+  idx = np.arange(i, dtype=dtype)
+
+  # Calculate apodization
+  apod = (beta ** 2 - (np.pi * width * (idx - i // 2) / os_i) ** 2) ** 0.5
+  apod /= np.sinh(apod)
+  apod *= factor
+  if sign is not None:
+    apod = apod * _checkerboard_phase(np.arange(i) - i // 2, os_i // 2,
+                                      os_i, sign, apod.dtype)
+
+  apod.flags.writeable = False
+  return apod
+
+
 def estimate_shape(coord):
   """Estimate array shape from coordinates.
   Shape is estimated by the different between maximum and minimum of
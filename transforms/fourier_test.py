@@ -0,0 +1,53 @@
+"""Tests for transforms.fourier."""
+
+import unittest
+
+import jax.numpy as jnp
+import numpy as np
+
+from transforms import fourier
+
+
+class CheckerMethodTest(unittest.TestCase):
+  """The 'checker' centering matches the 'shift' centering."""
+
+  CASES = [
+      # (ishape, oshape, axes)
+      ((8, 8), None, None),  # even
+      ((7, 9), None, None),  # odd
+      ((6, 7), (10, 12), None),  # pad
+      ((9, 8), (5, 6), None),  # crop
+      ((4, 6, 5), (4, 9, 8), (1, 2)),  # pad over a subset of axes
+      ((4, 6, 5), (3, 6, 3), (-1, 0)),  # crop over unordered axes
+  ]
+
+  def _check(self, transform, dtype):
+    rng = np.random.RandomState(0)
+    for ishape, oshape, axes in self.CASES:
+      x = rng.randn(*ishape)
+      if dtype == np.complex64:
+        x = x + 1j * rng.randn(*ishape)
+      x = jnp.asarray(x.astype(dtype))
+      for norm in (None, 'ortho'):
+        with self.subTest(ishape=ishape, oshape=oshape, axes=axes,
+                          norm=norm):
+          expected = transform(x, oshape=oshape, axes=axes, norm=norm,
+                               method='shift')
+          output = transform(x, oshape=oshape, axes=axes, norm=norm,
+                             method='checker')
+          self.assertEqual(output.shape, expected.shape)
+          np.testing.assert_allclose(output, expected, rtol=1e-4,
+                                     atol=1e-4 * np.abs(expected).max())
+
+  def test_fft(self):
+    self._check(fourier.fft, np.complex64)
+
+  def test_fft_real(self):
+    self._check(fourier.fft, np.float32)
+
+  def test_ifft(self):
+    self._check(fourier.ifft, np.complex64)
+
+
+if __name__ == '__main__':
+  unittest.main()
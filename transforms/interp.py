@@ -10,7 +10,7 @@ from transforms import util
 
 __all__ = ['interpolate']
 
-KERNELS = ['spline', 'kaiser_bessel']
+KERNELS = ['spline', 'kaiser_bessel', 'table']
 
 
 def interpolate(input, coord, kernel='spline', width=2, param=1):
@@ -48,12 +48,19 @@ def interpolate(input, coord, kernel='spline', width=2, param=1):
   The modified Bessel function of the first kind is approximated
   using the power series, following the reference.
 
+  'table' linearly interpolates a lookup table of the kernel,
+  passed as param, whose samples cover :math:`|x|` from 0 to 1.
+  It avoids evaluating the kernel for every neighbor, e.g. with a
+  precomputed Kaiser-Bessel table.
+
   Args:
       input (array): Input array of shape.
       coord (array): Coordinate array of shape [..., ndim]
       width (float or tuple of floats): Interpolation kernel full-width.
-      kernel (str): Interpolation kernel, {'spline', 'kaiser_bessel'}.
-      param (float or tuple of floats): Kernel parameter.
+      kernel (str): Interpolation kernel,
+          {'spline', 'kaiser_bessel', 'table'}.
+      param (float or tuple of floats or array): Kernel parameter,
+          the lookup table for 'table'.
 
   Returns:
       output (array): Output array.
@@ -73,7 +80,9 @@ def interpolate(input, coord, kernel='spline', width=2, param=1):
   input = input.reshape([batch_size] + list(input.shape[-ndim:]))
   coord = coord.reshape([npts, ndim])
 
-  if np.isscalar(param):
+  if kernel == 'table':
+    param = jnp.broadcast_to(param, (ndim,) + param.shape)
+  elif np.isscalar(param):
     param = jnp.array([param] * ndim, coord.dtype)
   else:
     param = jnp.array(param, coord.dtype)
@@ -116,11 +125,24 @@ def _kaiser_bessel_kernel(x, beta):
                              ))
 
 
+def _table_kernel(x, table):
+  n = table.shape[-1] - 1
+  t = jnp.minimum(jnp.abs(x), 1.) * n
+  i = jnp.minimum(jnp.floor(t).astype(jnp.int32), n - 1)
+  f = t - i
+  # Low-precision tables are widened after the lookup.
+  lo = table[i].astype(f.dtype)
+  hi = table[i + 1].astype(f.dtype)
+  return jnp.where(jnp.abs(x) > 1., 0., lo * (1 - f) + hi * f)
+
+
 def _get_interpolate(kernel):
   if kernel == 'spline':
     kernel = _spline_kernel
   elif kernel == 'kaiser_bessel':
     kernel = _kaiser_bessel_kernel
+  elif kernel == 'table':
+    kernel = _table_kernel
 
   def _interpolate1(input, coord, width, param):
     kx = coord[:, -1]
@@ -228,12 +250,19 @@ def gridding(input, coord, shape, kernel="spline", width=2, param=1):
   The modified Bessel function of the first kind is approximated
   using the power series, following the reference.
 
+  'table' linearly interpolates a lookup table of the kernel,
+  passed as param, whose samples cover :math:`|x|` from 0 to 1.
+  It avoids evaluating the kernel for every neighbor, e.g. with a
+  precomputed Kaiser-Bessel table.
+
   Args:
       input (array): Input array.
       coord (array): Coordinate array of shape [..., ndim]
       width (float or tuple of floats): Interpolation kernel full-width.
-      kernel (str): Interpolation kernel, {"spline", "kaiser_bessel"}.
-      param (float or tuple of floats): Kernel parameter.
+      kernel (str): Interpolation kernel,
+          {"spline", "kaiser_bessel", "table"}.
+      param (float or tuple of floats or array): Kernel parameter,
+          the lookup table for 'table'.
 
   Returns:
       output (array): Output array.
@@ -254,7 +283,9 @@ def gridding(input, coord, shape, kernel="spline", width=2, param=1):
   coord = coord.reshape([npts, ndim])
   output = jnp.zeros([batch_size] + list(shape[-ndim:]), dtype=input.dtype)
 
-  if np.isscalar(param):
+  if kernel == 'table':
+    param = jnp.broadcast_to(param, (ndim,) + param.shape)
+  elif np.isscalar(param):
     param = np.array([param] * ndim, coord.dtype)
   else:
     param = np.array(param, coord.dtype)
@@ -274,36 +305,27 @@ def _get_gridding(kernel):
     kernel = _spline_kernel
   elif kernel == 'kaiser_bessel':
     kernel = _kaiser_bessel_kernel
+  elif kernel == 'table':
+    kernel = _table_kernel
 
   interpolate1, interpolate2, interpolate3 = _get_interpolate(kernel)
 
-  # implementing transposed convolutions with gradients
+  # implementing transposed convolutions as linear transposes, which
+  # scatter the complex values in a single pass
   def _gridding1(output, input, coord, width, param):
-    def helper(output, input):
-      value = interpolate1(output, coord, width, param)
-      value = jnp.sum(value * input)
-      return value
-
-    grad_fn = jax.grad(helper, argnums=0)
-    return grad_fn(output.real, input.real) + 1j * grad_fn(output.imag, input.imag)
+    transpose_fn = jax.linear_transpose(
+        lambda output: interpolate1(output, coord, width, param), output)
+    return transpose_fn(input)[0]
 
   def _gridding2(output, input, coord, width, param):
-    def helper(output, input):
-      value = interpolate2(output, coord, width, param)
-      value = jnp.sum(value * input)
-      return value
-
-    grad_fn = jax.grad(helper, argnums=0)
-    return grad_fn(output.real, input.real) + 1j * grad_fn(output.imag, input.imag)
+    transpose_fn = jax.linear_transpose(
+        lambda output: interpolate2(output, coord, width, param), output)
+    return transpose_fn(input)[0]
 
   def _gridding3(output, input, coord, width, param):
-    def helper(output, input):
-      value = interpolate3(output, coord, width, param)
-      value = jnp.sum(value * input)
-      return value
-
-    grad_fn = jax.grad(helper, argnums=0)
-    return grad_fn(output.real, input.real) + 1j * grad_fn(output.imag, input.imag)
+    transpose_fn = jax.linear_transpose(
+        lambda output: interpolate3(output, coord, width, param), output)
+    return transpose_fn(input)[0]
 
   return _gridding1, _gridding2, _gridding3
 
@@ -5,10 +5,11 @@ __all__ = ['prod', 'resize']
 
 
 def _normalize_axes(axes, ndim):
+  # Non-negative and ascending, so the contiguous last axis comes last.
   if axes is None:
     return tuple(range(ndim))
   else:
-    return tuple(a % ndim for a in sorted(axes))
+    return tuple(sorted(a % ndim for a in axes))
 
 
 def _normalize_shape(shape):
@@ -62,10 +63,9 @@ def resize(input, oshape, ishift=None, oshift=None):
   copy_shape = [min(i - si, o - so)
                 for i, si, o, so in zip(ishape1, ishift, oshape1, oshift)]
   islice = tuple([slice(si, si + c) for si, c in zip(ishift, copy_shape)])
-  oslice = tuple([slice(so, so + c) for so, c in zip(oshift, copy_shape)])
+  pads = [(so, o - so - c) for so, o, c in zip(oshift, oshape1, copy_shape)]
 
-  output = jnp.zeros(oshape1, dtype=input.dtype)
-  input = input.reshape(ishape1)
-  output = output.at[oslice].set(input[islice])
+  # One crop and one pad, rather than a scatter into a zeros array.
+  output = jnp.pad(input.reshape(ishape1)[islice], pads)
 
   return output.reshape(oshape)